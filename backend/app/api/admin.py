@@ -1,18 +1,18 @@
 import json
 from pathlib import Path
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from openai import OpenAI
 
 from app.core.config import settings
 from app.db.database import get_sync_session
 from app.db.models import Food
-from app.rag import get_collection
+from app.rag import get_collection, bump_catalog_version, embed_texts
 
 router = APIRouter()
 
 
-@router.post("/ingest")
-def ingest_foods():
+def _store_foods() -> list[dict]:
     data_file = Path(__file__).parent.parent.parent / "data" / "foods.json"
     
     if not data_file.exists():
@@ -40,9 +40,23 @@ def ingest_foods():
             session.merge(food)
         session.commit()
     
+    return foods_data
+
+
+def _count_foods() -> int:
+    with get_sync_session() as session:
+        from sqlmodel import select, func
+        return session.exec(select(func.count()).select_from(Food)).one()
+
+
+@router.post("/ingest")
+async def ingest_foods():
+    # File and psycopg2 work is blocking; keep it off the event loop
+    foods_data = await run_in_threadpool(_store_foods)
+    
     # Create embeddings and insert into ChromaDB
     client = OpenAI(api_key=settings.openai_api_key)
-    collection = get_collection()
+    collection = await get_collection()
     
     ids = []
     documents = []
@@ -61,20 +75,20 @@ def ingest_foods():
             "allergens": ",".join(item.get("allergens", [])),
         })
     
-    # Upsert to ChromaDB (it will auto-embed with default embedder)
-    collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+    # Embed off the event loop; upsert would otherwise run the default
+    # embedder synchronously inside the coroutine
+    embeddings = await embed_texts(documents)
+    await collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+    await bump_catalog_version()
     
     return {"ingested": len(foods_data), "status": "success"}
 
 
 @router.get("/stats")
-def get_stats():
-    collection = get_collection()
-    count = collection.count()
-    
-    with get_sync_session() as session:
-        from sqlmodel import select, func
-        food_count = session.exec(select(func.count()).select_from(Food)).one()
+async def get_stats():
+    collection = await get_collection()
+    count = await collection.count()
+    food_count = await run_in_threadpool(_count_foods)
     
     return {
         "chroma_documents": count,
@@ -1,6 +1,8 @@
 from typing import Optional
+import orjson
 from pydantic import BaseModel
 from fastapi import APIRouter
+from openai.types.chat import ChatCompletionMessageParam
 from sse_starlette.sse import EventSourceResponse
 
 from app.rag import search_foods
@@ -20,13 +22,14 @@ async def chat(request: ChatRequest):
     prefs = request.preferences or {}
     
     # Search for relevant foods with preference filtering
-    foods = search_foods(
+    foods = await search_foods(
         query=request.message,
         allergies=prefs.get("allergies", []),
         dietary_type=prefs.get("dietary_type"),
         cuisines=prefs.get("preferred_cuisines", []),
         spice_level=prefs.get("spice_level"),
         n_results=6,
+        include_documents=True,
     )
     
     # Build context from retrieved foods
@@ -40,12 +43,11 @@ async def chat(request: ChatRequest):
             )
         context = "\n".join(context_parts)
     
-    messages = [{"role": "user", "content": request.message}]
+    messages: list[ChatCompletionMessageParam] = [{"role": "user", "content": request.message}]
     
     async def event_generator():
         async for chunk in generate_streaming_response(messages, context):
-            import json
-            yield {"event": "message", "data": json.dumps({"content": chunk})}
+            yield {"event": "message", "data": orjson.dumps({"content": chunk}).decode("utf-8")}
         yield {"event": "done", "data": ""}
     
     return EventSourceResponse(event_generator())
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -11,6 +12,11 @@ class Settings(BaseSettings):
     chroma_collection: str = "foods"
     backend_host: str = "0.0.0.0"
     backend_port: int = 8080
+    debug: bool = False
+    stream_buffer_size: int = 4096
+    stream_flush_interval: float = 0.025
+    search_batch_window: float = 0.005
+    catalog_check_interval: float = 10.0
     
     class Config:
         env_file = ".env"
@@ -23,3 +29,32 @@ def get_settings() -> Settings:
 
 
 settings = get_settings()
+
+
+@dataclass(frozen=True, slots=True)
+class _Runtime:
+    """Plain snapshot of the settings read on per-request hot paths."""
+    openai_api_key: str
+    openai_model: str
+    chroma_host: str
+    chroma_port: int
+    chroma_collection: str
+    stream_buffer_size: int
+    stream_flush_interval: float
+    search_batch_window: float
+    catalog_check_interval: float
+    debug: bool
+
+
+RUNTIME = _Runtime(
+    openai_api_key=settings.openai_api_key,
+    openai_model=settings.openai_model,
+    chroma_host=settings.chroma_host,
+    chroma_port=settings.chroma_port,
+    chroma_collection=settings.chroma_collection,
+    stream_buffer_size=settings.stream_buffer_size,
+    stream_flush_interval=settings.stream_flush_interval,
+    search_batch_window=settings.search_batch_window,
+    catalog_check_interval=settings.catalog_check_interval,
+    debug=settings.debug,
+)
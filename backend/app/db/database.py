@@ -13,6 +13,8 @@ sync_engine = create_engine(
 async_engine = create_async_engine(
     settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
     echo=False,
+    pool_size=20,
+    max_overflow=0,
 )
 
 async_session_factory = sessionmaker(
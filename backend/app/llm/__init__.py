@@ -1,3 +1,3 @@
-from app.llm.openai_client import generate_streaming_response, generate_response, get_openai_client
+from app.llm.openai_client import generate_streaming_response, generate_response, get_openai_client, close_openai_client
 
-__all__ = ["generate_streaming_response", "generate_response", "get_openai_client"]
+__all__ = ["generate_streaming_response", "generate_response", "get_openai_client", "close_openai_client"]
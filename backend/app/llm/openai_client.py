@@ -1,10 +1,34 @@
-from typing import AsyncGenerator
-from openai import AsyncOpenAI
-from app.core.config import settings
+import asyncio
+import hashlib
+from typing import AsyncGenerator, AsyncIterator
+import httpx
+import orjson
+from openai import APIError, AsyncOpenAI
+from openai.types.chat import ChatCompletionMessageParam
+from app.core.config import RUNTIME
+
+
+_client: AsyncOpenAI | None = None
 
 
 def get_openai_client() -> AsyncOpenAI:
-    return AsyncOpenAI(api_key=settings.openai_api_key)
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=RUNTIME.openai_api_key,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+                timeout=httpx.Timeout(60.0, connect=5.0),
+            ),
+        )
+    return _client
+
+
+async def close_openai_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
 
 
 SYSTEM_PROMPT = """You are a friendly and knowledgeable Indian food recommendation assistant. You specialize in vegetarian Indian cuisine from all regions - South Indian, North Indian, Gujarati, Bengali, Rajasthani, and more.
@@ -30,14 +54,76 @@ Always format your recommendations clearly. For each dish, include:
 
 If the user has allergies or restrictions, explicitly confirm that your suggestions avoid those items."""
 
+# The provider's prompt cache keys on exact prefix bytes, so SYSTEM_PROMPT must
+# not drift by accident. Editing it intentionally requires updating this hash.
+_SYSTEM_PROMPT_SHA = "4c2f013df1b6b908beedbfe29e2733d8db4d2f5c476bb8d3ed8711a123c0ace5"
+
+if hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest() != _SYSTEM_PROMPT_SHA:
+    raise RuntimeError("SYSTEM_PROMPT changed; update _SYSTEM_PROMPT_SHA to match")
+
+# Always message[0], with any retrieved context in a separate system message
+# after it, so the cached prefix is identical across requests
+_SYSTEM_MSG: tuple[ChatCompletionMessageParam, ...] = (
+    {"role": "system", "content": SYSTEM_PROMPT},
+)
+
+
+async def _buffer_stream(
+    deltas: AsyncIterator[str],
+    max_size: int,
+    flush_interval: float,
+) -> AsyncGenerator[str, None]:
+    """Coalesce token deltas, flushing at max_size UTF-8 bytes or once the oldest is flush_interval old."""
+    loop = asyncio.get_running_loop()
+    buf: list[str] = []
+    size = 0
+    deadline = 0.0
+    pending: asyncio.Future | None = None
+    
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(anext(deltas))
+            
+            timeout = max(deadline - loop.time(), 0) if buf else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            
+            if done:
+                task, pending = pending, None
+                try:
+                    text = task.result()
+                except StopAsyncIteration:
+                    break
+                except BaseException:
+                    # Deliver what was already received before surfacing the error
+                    if buf:
+                        yield "".join(buf)
+                    raise
+                if not buf:
+                    deadline = loop.time() + flush_interval
+                buf.append(text)
+                size += len(text.encode())
+                if size < max_size and loop.time() < deadline:
+                    continue
+            
+            yield "".join(buf)
+            buf.clear()
+            size = 0
+        
+        if buf:
+            yield "".join(buf)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
 
 async def generate_streaming_response(
-    messages: list[dict],
+    messages: list[ChatCompletionMessageParam],
     context: str | None = None,
 ) -> AsyncGenerator[str, None]:
     client = get_openai_client()
     
-    full_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    full_messages: list[ChatCompletionMessageParam] = list(_SYSTEM_MSG)
     
     if context:
         full_messages.append({
@@ -47,26 +133,53 @@ async def generate_streaming_response(
     
     full_messages.extend(messages)
     
-    stream = await client.chat.completions.create(
-        model=settings.openai_model,
+    # Read the raw SSE lines rather than letting the SDK build a
+    # ChatCompletionChunk model per token; we only need delta.content.
+    async with client.chat.completions.with_streaming_response.create(
+        model=RUNTIME.openai_model,
         messages=full_messages,
         stream=True,
         temperature=0.7,
         max_tokens=1500,
-    )
-    
-    async for chunk in stream:
-        if chunk.choices[0].delta.content:
-            yield chunk.choices[0].delta.content
+    ) as response:
+        async def deltas():
+            async for line in response.iter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                chunk = orjson.loads(data)
+                if error := chunk.get("error"):
+                    message = error.get("message") if isinstance(error, dict) else None
+                    raise APIError(
+                        message or "An error occurred during streaming",
+                        response.http_request,
+                        body=error,
+                    )
+                choices = chunk.get("choices")
+                if choices and (content := choices[0]["delta"].get("content")):
+                    yield content
+        
+        async for text in _buffer_stream(
+            deltas(),
+            RUNTIME.stream_buffer_size,
+            RUNTIME.stream_flush_interval,
+        ):
+            yield text
+            # Give the ASGI layer a scheduling tick. Never sleep for a non-zero
+            # duration here to "pace" output: a 10ms sleep per flush roughly
+            # halves streaming throughput.
+            await asyncio.sleep(0)
 
 
 async def generate_response(
-    messages: list[dict],
+    messages: list[ChatCompletionMessageParam],
     context: str | None = None,
 ) -> str:
     client = get_openai_client()
     
-    full_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    full_messages: list[ChatCompletionMessageParam] = list(_SYSTEM_MSG)
     
     if context:
         full_messages.append({
@@ -77,7 +190,7 @@ async def generate_response(
     full_messages.extend(messages)
     
     response = await client.chat.completions.create(
-        model=settings.openai_model,
+        model=RUNTIME.openai_model,
         messages=full_messages,
         temperature=0.7,
         max_tokens=1500,
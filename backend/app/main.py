@@ -1,15 +1,22 @@
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import chat, preferences, conversations, admin
+from app.core.config import settings
 from app.db.database import init_db
+from app.llm import close_openai_client
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Keep third-party loggers (httpx, chromadb, ...) at INFO; debug only our own
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("app").setLevel(logging.DEBUG if settings.debug else logging.INFO)
     await init_db()
     yield
+    await close_openai_client()
 
 
 app = FastAPI(
@@ -1,98 +1,117 @@
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-import json
+import logging
+import orjson
+from sqlalchemy.dialects.postgresql import insert
 
+from app.core.config import RUNTIME
 from app.rag import search_foods, get_food_by_id
-from app.db.database import get_sync_session
+from app.db.database import get_async_session
 from app.db.models import UserPreferences
 
 
 server = Server("food-tools")
 
+PREFERENCE_FIELDS = ("dietary_type", "spice_level", "allergies", "preferred_cuisines")
 
-@server.list_tools()
-async def list_tools():
-    return [
-        Tool(
-            name="search_food",
-            description="Search for Indian vegetarian food based on query and preferences",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {"type": "string", "description": "What kind of food to search for"},
-                    "allergies": {"type": "array", "items": {"type": "string"}, "description": "Allergens to exclude"},
-                    "spice_level": {"type": "string", "enum": ["mild", "medium", "spicy", "extra_spicy"]},
-                    "cuisine": {"type": "string", "description": "Preferred cuisine type"},
-                    "meal_type": {"type": "string", "enum": ["breakfast", "lunch", "dinner", "snack", "dessert"]},
-                },
-                "required": ["query"],
+
+def _dumps(obj) -> str:
+    option = orjson.OPT_INDENT_2 if RUNTIME.debug else 0
+    return orjson.dumps(obj, option=option).decode("utf-8")
+
+
+_TOOLS = [
+    Tool(
+        name="search_food",
+        description="Search for Indian vegetarian food based on query and preferences",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "What kind of food to search for"},
+                "allergies": {"type": "array", "items": {"type": "string"}, "description": "Allergens to exclude"},
+                "spice_level": {"type": "string", "enum": ["mild", "medium", "spicy", "extra_spicy"]},
+                "cuisine": {"type": "string", "description": "Preferred cuisine type"},
+                "meal_type": {"type": "string", "enum": ["breakfast", "lunch", "dinner", "snack", "dessert"]},
+                "include_documents": {"type": "boolean", "description": "Include the full dish description in each result", "default": False},
             },
-        ),
-        Tool(
-            name="get_food_details",
-            description="Get detailed information about a specific food item",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "food_id": {"type": "string", "description": "The food item ID"},
-                },
-                "required": ["food_id"],
+            "required": ["query"],
+        },
+    ),
+    Tool(
+        name="get_food_details",
+        description="Get detailed information about a specific food item",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "food_id": {"type": "string", "description": "The food item ID"},
             },
-        ),
-        Tool(
-            name="save_preferences",
-            description="Save user dietary preferences",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "user_id": {"type": "string"},
-                    "dietary_type": {"type": "string"},
-                    "spice_level": {"type": "string"},
-                    "allergies": {"type": "array", "items": {"type": "string"}},
-                    "preferred_cuisines": {"type": "array", "items": {"type": "string"}},
-                },
-                "required": ["user_id"],
+            "required": ["food_id"],
+        },
+    ),
+    Tool(
+        name="save_preferences",
+        description="Save user dietary preferences",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "user_id": {"type": "string"},
+                "dietary_type": {"type": "string"},
+                "spice_level": {"type": "string"},
+                "allergies": {"type": "array", "items": {"type": "string"}},
+                "preferred_cuisines": {"type": "array", "items": {"type": "string"}},
             },
-        ),
-    ]
+            "required": ["user_id"],
+        },
+    ),
+]
+
+_FOOD_NOT_FOUND = TextContent(type="text", text="Food not found")
+_PREFERENCES_SAVED = TextContent(type="text", text="Preferences saved")
+
+
+@server.list_tools()
+async def list_tools():
+    return _TOOLS
 
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict):
     if name == "search_food":
-        results = search_foods(
+        results = await search_foods(
             query=arguments["query"],
             allergies=arguments.get("allergies"),
             spice_level=arguments.get("spice_level"),
             meal_type=arguments.get("meal_type"),
+            include_documents=arguments.get("include_documents", False),
         )
-        return [TextContent(type="text", text=json.dumps(results, indent=2))]
+        return [TextContent(type="text", text=_dumps(results))]
     
     elif name == "get_food_details":
-        food = get_food_by_id(arguments["food_id"])
+        food = await get_food_by_id(arguments["food_id"])
         if food:
-            return [TextContent(type="text", text=json.dumps(food, indent=2))]
-        return [TextContent(type="text", text="Food not found")]
+            return [TextContent(type="text", text=_dumps(food))]
+        return [_FOOD_NOT_FOUND]
     
     elif name == "save_preferences":
-        with get_sync_session() as session:
-            prefs = session.query(UserPreferences).filter_by(user_id=arguments["user_id"]).first()
-            if not prefs:
-                prefs = UserPreferences(user_id=arguments["user_id"])
-                session.add(prefs)
-            
-            for key in ["dietary_type", "spice_level", "allergies", "preferred_cuisines"]:
-                if key in arguments:
-                    setattr(prefs, key, arguments[key])
-            
-            session.commit()
-        return [TextContent(type="text", text="Preferences saved")]
+        updates = {key: arguments[key] for key in PREFERENCE_FIELDS if key in arguments}
+        values = UserPreferences(user_id=arguments["user_id"], **updates).model_dump()
+        stmt = insert(UserPreferences).values(**values).on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={**updates, "updated_at": values["updated_at"]},
+        )
+        
+        async with get_async_session() as session:
+            await session.execute(stmt)
+        return [_PREFERENCES_SAVED]
     
     return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
 
 async def main():
+    # stdout carries the MCP protocol, so logs go to stderr (the basicConfig default)
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("app").setLevel(logging.DEBUG if RUNTIME.debug else logging.INFO)
     async with stdio_server() as (read_stream, write_stream):
         await server.run(read_stream, write_stream)
 
@@ -1,3 +1,3 @@
-from app.rag.retriever import search_foods, get_food_by_id, get_collection
+from app.rag.retriever import search_foods, get_food_by_id, get_collection, bump_catalog_version, embed_texts
 
-__all__ = ["search_foods", "get_food_by_id", "get_collection"]
+__all__ = ["search_foods", "get_food_by_id", "get_collection", "bump_catalog_version", "embed_texts"]
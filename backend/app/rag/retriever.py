@@ -1,40 +1,157 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
 import chromadb
+from chromadb.api import AsyncClientAPI
+from chromadb.api.models.AsyncCollection import AsyncCollection
 from chromadb.config import Settings as ChromaSettings
-from app.core.config import settings
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+from app.core.config import RUNTIME
 
 
-def get_chroma_client():
-    return chromadb.HttpClient(
-        host=settings.chroma_host,
-        port=settings.chroma_port,
-        settings=ChromaSettings(anonymized_telemetry=False),
-    )
+logger = logging.getLogger(__name__)
 
+_client: AsyncClientAPI | None = None
+_collection: AsyncCollection | None = None
+_lock = asyncio.Lock()
 
-def get_collection():
-    client = get_chroma_client()
-    return client.get_or_create_collection(
-        name=settings.chroma_collection,
-        metadata={"hnsw:space": "cosine"}
-    )
+# The local ONNX embedder is CPU-bound (and downloads its model on first use),
+# so it always runs through embed_texts() in a worker thread
+_embedder = DefaultEmbeddingFunction()
 
 
-def search_foods(
-    query: str,
-    allergies: list[str] | None = None,
-    dietary_type: str | None = None,
-    cuisines: list[str] | None = None,
-    spice_level: str | None = None,
-    meal_type: str | None = None,
-    n_results: int = 5,
-) -> list[dict]:
-    collection = get_collection()
+class _TTLCache:
+    """Small LRU mapping whose entries expire ttl seconds after insertion."""
     
-    where_filters = []
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
     
-    if allergies:
-        for allergen in allergies:
-            where_filters.append({"$not": {"allergens": {"$contains": allergen}}})
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key, value) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_search_cache = _TTLCache(maxsize=256, ttl=300)
+_food_cache = _TTLCache(maxsize=1024, ttl=3600)
+
+# Ingestion stamps a new value under this collection metadata key; every
+# process that caches results compares against it and drops stale entries.
+CATALOG_VERSION_KEY = "catalog_version"
+_catalog_version: str | None = None
+_catalog_checked_at = float("-inf")
+# Bumped on every clear so lookups that started earlier don't repopulate
+# the caches with pre-clear results
+_cache_generation = 0
+
+
+def _clear_caches() -> None:
+    global _cache_generation
+    _cache_generation += 1
+    _search_cache.clear()
+    _food_cache.clear()
+
+
+async def get_chroma_client() -> AsyncClientAPI:
+    global _client
+    if _client is None:
+        async with _lock:
+            if _client is None:
+                _client = await chromadb.AsyncHttpClient(
+                    host=RUNTIME.chroma_host,
+                    port=RUNTIME.chroma_port,
+                    settings=ChromaSettings(anonymized_telemetry=False),
+                )
+    return _client
+
+
+async def get_collection() -> AsyncCollection:
+    global _collection
+    if _collection is None:
+        client = await get_chroma_client()
+        async with _lock:
+            if _collection is None:
+                _collection = await client.get_or_create_collection(
+                    name=RUNTIME.chroma_collection,
+                    metadata={"hnsw:space": "cosine"},
+                    embedding_function=_embedder,
+                )
+    return _collection
+
+
+async def embed_texts(texts: list[str]) -> list:
+    return await asyncio.to_thread(_embedder, texts)
+
+
+async def bump_catalog_version() -> None:
+    """Record that the collection changed so every process drops its caches."""
+    global _catalog_version
+    collection = await get_collection()
+    # modify() replaces metadata but rejects hnsw:* keys; the distance
+    # function lives in the collection configuration and is unaffected
+    metadata = {
+        key: value for key, value in (collection.metadata or {}).items()
+        if not key.startswith("hnsw:")
+    }
+    metadata[CATALOG_VERSION_KEY] = uuid.uuid4().hex
+    await collection.modify(metadata=metadata)
+    
+    _catalog_version = metadata[CATALOG_VERSION_KEY]
+    _clear_caches()
+
+
+async def _check_catalog_version() -> None:
+    """Clear the result caches if another process has re-ingested the catalog."""
+    global _catalog_version, _catalog_checked_at
+    now = time.monotonic()
+    if now - _catalog_checked_at < RUNTIME.catalog_check_interval:
+        return
+    _catalog_checked_at = now
+    
+    try:
+        client = await get_chroma_client()
+        collection = await client.get_collection(name=RUNTIME.chroma_collection)
+    except Exception as e:
+        logger.warning("ChromaDB catalog version check failed: %s", e)
+        return
+    
+    version = (collection.metadata or {}).get(CATALOG_VERSION_KEY)
+    if version != _catalog_version:
+        _catalog_version = version
+        _clear_caches()
+
+
+@lru_cache(maxsize=512)
+def _build_where(
+    allergies: tuple[str, ...],
+    dietary_type: str | None,
+    spice_level: str | None,
+    meal_type: str | None,
+) -> dict | None:
+    # The returned dict is shared between calls; callers must not mutate it
+    where_filters = [
+        {"$not": {"allergens": {"$contains": allergen}}} for allergen in allergies
+    ]
     
     if dietary_type:
         where_filters.append({"tags": {"$contains": dietary_type}})
@@ -45,54 +162,156 @@ def search_foods(
     if meal_type:
         where_filters.append({"meal_type": meal_type})
     
-    where = None
-    if where_filters:
-        if len(where_filters) == 1:
-            where = where_filters[0]
-        else:
-            where = {"$and": where_filters}
+    if not where_filters:
+        return None
+    if len(where_filters) == 1:
+        return where_filters[0]
+    return {"$and": where_filters}
+
+
+class QueryCoalescer:
+    """Micro-batch concurrent searches into multi-query Chroma requests.
     
-    try:
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results,
-            where=where,
-            include=["documents", "metadatas", "distances"],
-        )
+    Searches submitted within `window` seconds of each other that share the
+    same filters, n_results and include set go out as one collection.query
+    call, and each caller receives its own slice of the results.
+    """
+    
+    def __init__(self, window: float):
+        self.window = window
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+    
+    async def submit(
+        self,
+        query: str,
+        filters: tuple,
+        n_results: int,
+        include_documents: bool,
+    ) -> dict:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(((filters, n_results, include_documents), query, future))
+        return await future
+    
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            await asyncio.sleep(self.window)
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            
+            groups = defaultdict(list)
+            for key, query, future in batch:
+                groups[key].append((query, future))
+            for key, items in groups.items():
+                task = asyncio.create_task(self._dispatch(key, items))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+    
+    async def _dispatch(self, key: tuple, items: list) -> None:
+        filters, n_results, include_documents = key
+        try:
+            collection = await get_collection()
+            query_embeddings = await embed_texts([query for query, _ in items])
+            results = await collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=_build_where(*filters),
+                include=["metadatas", "distances"] + (["documents"] if include_documents else []),
+            )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
         
-        foods = []
-        if results["documents"] and results["documents"][0]:
-            for i, doc in enumerate(results["documents"][0]):
-                metadata = results["metadatas"][0][i] if results["metadatas"] else {}
-                foods.append({
-                    "id": results["ids"][0][i],
-                    "content": doc,
-                    "metadata": metadata,
-                    "score": 1 - results["distances"][0][i] if results["distances"] else 0,
+        for i, (_, future) in enumerate(items):
+            if not future.done():
+                future.set_result({
+                    "ids": results["ids"][i],
+                    "documents": results["documents"][i] if results["documents"] else None,
+                    "metadatas": results["metadatas"][i] if results["metadatas"] else None,
+                    "distances": results["distances"][i] if results["distances"] else None,
                 })
+
+
+_coalescer = QueryCoalescer(window=RUNTIME.search_batch_window)
+
+
+async def search_foods(
+    query: str,
+    allergies: list[str] | None = None,
+    dietary_type: str | None = None,
+    cuisines: list[str] | None = None,
+    spice_level: str | None = None,
+    meal_type: str | None = None,
+    n_results: int = 5,
+    include_documents: bool = False,
+) -> list[dict]:
+    filters = (tuple(allergies or ()), dietary_type, spice_level, meal_type)
+    cache_key = (query, filters, n_results, include_documents)
+    await _check_catalog_version()
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    generation = _cache_generation
+    try:
+        hit = await _coalescer.submit(query, filters, n_results, include_documents)
+        
+        ids = hit["ids"]
+        metas = hit["metadatas"] or [{}] * len(ids)
+        dists = hit["distances"] or [1.0] * len(ids)
         
+        if include_documents:
+            foods = [
+                {"id": food_id, "content": doc, "metadata": meta, "score": 1 - dist}
+                for food_id, doc, meta, dist in zip(ids, hit["documents"], metas, dists)
+            ]
+        else:
+            foods = [
+                {"id": food_id, "metadata": meta, "score": 1 - dist}
+                for food_id, meta, dist in zip(ids, metas, dists)
+            ]
+        
+        if generation == _cache_generation:
+            _search_cache.set(cache_key, foods)
         return foods
     except Exception as e:
-        print(f"ChromaDB search error: {e}")
+        logger.exception("ChromaDB search error: %s", e)
         return []
 
 
-def get_food_by_id(food_id: str) -> dict | None:
-    collection = get_collection()
+async def get_food_by_id(food_id: str) -> dict | None:
+    await _check_catalog_version()
+    cached = _food_cache.get(food_id)
+    if cached is not None:
+        return cached
+    
+    generation = _cache_generation
+    collection = await get_collection()
     
     try:
-        result = collection.get(
+        result = await collection.get(
             ids=[food_id],
             include=["documents", "metadatas"],
         )
         
         if result["documents"]:
-            return {
+            food = {
                 "id": food_id,
                 "content": result["documents"][0],
                 "metadata": result["metadatas"][0] if result["metadatas"] else {},
             }
+            if generation == _cache_generation:
+                _food_cache.set(food_id, food)
+            return food
         return None
     except Exception as e:
-        print(f"ChromaDB get error: {e}")
+        logger.exception("ChromaDB get error: %s", e)
         return None